@@ -1,4 +1,7 @@
+import os
+import stat
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from models import db
 from auth import bp_auth, login_manager   # usa o login_manager definido em auth.py
 from routes import bp
@@ -9,6 +12,10 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # Jinja: cache de bytecode em disco (o jinja_env só é criado no 1º acesso)
+    app.jinja_options = {**app.jinja_options,
+                         'bytecode_cache': bytecode_cache(app.config['JINJA_BYTECODE_CACHE_DIR'])}
+
     # Inicializações
     db.init_app(app)
     login_manager.init_app(app)
@@ -21,9 +28,35 @@ def create_app():
     def health():
         return {'status': 'ok'}
 
+    precompile_templates(app)
+
     return app
 
 
+def bytecode_cache(cache_dir=None):
+    """Cache de bytecode do Jinja. A pasta tem de ser privada: o Jinja executa o que lá estiver."""
+    if not cache_dir:
+        return FileSystemBytecodeCache()   # _jinja2-cache-<uid>, com verificação de dono/modo
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    st = os.lstat(cache_dir)
+    if not stat.S_ISDIR(st.st_mode):
+        raise RuntimeError(f"JINJA_BYTECODE_CACHE_DIR não é uma pasta: {cache_dir}")
+    # dono/modo só existem em POSIX (no Windows vale a ACL da pasta)
+    if hasattr(os, 'getuid') and (st.st_uid != os.getuid() or st.st_mode & 0o077):
+        raise RuntimeError(
+            f"JINJA_BYTECODE_CACHE_DIR inseguro: {cache_dir} "
+            "(tem de ser uma pasta do utilizador atual com modo 0700)"
+        )
+    return FileSystemBytecodeCache(cache_dir)
+
+
+def precompile_templates(app):
+    """Compila todos os templates no arranque (preenche a cache de bytecode e a do ambiente)."""
+    env = app.jinja_env
+    for name in env.list_templates(extensions=['html']):
+        env.get_template(name)
+
+
 if __name__ == '__main__':
     app = create_app()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,105 @@
+# bench_canteens.py
+# Benchmark multi-cantina: 100 000 utilizadores repartidos por 5 cantinas.
+# Mede kiosk / mark / check / admin de UMA cantina e mostra o plano das consultas principais.
+# Usa uma BD SQLite temporária; para testar em Postgres: BENCH_DATABASE_URL=<BD vazia e descartável>.
+# Uso: python bench_canteens.py [n_pedidos]
+import os, sys, time, random, tempfile
+from datetime import datetime, timedelta, time as dtime
+
+BENCH_URL = os.getenv("BENCH_DATABASE_URL") or \
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench_canteens_"), "bench.db")
+os.environ["DATABASE_URL"] = BENCH_URL
+
+from werkzeug.security import generate_password_hash
+from app import create_app
+from models import db, Canteen, User, Meal, Reservation, Attendance
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+N_USERS = 100_000
+CANTEENS = [
+    (1, "Bucareste", "Europe/Bucharest"),
+    (2, "Lisboa", "Europe/Lisbon"),
+    (3, "Madrid", "Europe/Madrid"),
+    (4, "Varsóvia", "Europe/Warsaw"),
+    (5, "Atenas", "Europe/Athens"),
+]
+MEALS = [("Pequeno-almoço", dtime(7, 30)), ("Almoço", dtime(12, 30)), ("Jantar", dtime(19, 30))]
+PIN = "1234"
+
+random.seed(42)
+
+
+def timed(label, fn, n=N):
+    fn()  # aquecimento
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    ms = (time.perf_counter() - t0) * 1000 / n
+    print(f"{label:<40} {ms:8.2f} ms/pedido")
+
+
+app = create_app()
+app.config["LOGIN_DISABLED"] = True
+print("DB URI =", BENCH_URL)
+
+with app.app_context():
+    db.create_all()
+    t0 = time.perf_counter()
+
+    db.session.execute(db.insert(Canteen), [
+        {"id": cid, "name": name, "timezone": tz, "window_before_min": 60 * 24, "window_after_min": 60 * 24}
+        for cid, name, tz in CANTEENS
+    ])
+    meal_rows, meals_by_canteen = [], {}
+    for cid, _, _ in CANTEENS:
+        for name, t in MEALS:
+            mid = len(meal_rows) + 1
+            meal_rows.append({"id": mid, "canteen_id": cid, "name": name, "scheduled_time": t})
+            meals_by_canteen.setdefault(cid, []).append(mid)
+    db.session.execute(db.insert(Meal), meal_rows)
+
+    # IDs acima de 32 767 (não cabiam em SMALLINT); PIN com hash barato (partilhado)
+    pin_hash = generate_password_hash(PIN, method="pbkdf2:sha256:1")
+    users = [{"id": uid, "canteen_id": (uid % len(CANTEENS)) + 1, "pin_hash": pin_hash}
+             for uid in range(1, N_USERS + 1)]
+    db.session.execute(db.insert(User), users)
+
+    # semana atual: ~2 cancelamentos por utilizador e presenças de hoje (~70%)
+    today = datetime.now().date()
+    res_rows, att_rows = [], []
+    for u in users:
+        mids = meals_by_canteen[u["canteen_id"]]
+        for d, mid in {(today + timedelta(days=random.randint(-3, 3)), random.choice(mids)) for _ in range(2)}:
+            res_rows.append({"id": len(res_rows) + 1, "canteen_id": u["canteen_id"], "user_id": u["id"], "meal_id": mid, "date": d})
+        for mid in mids:
+            if random.random() < 0.7:
+                att_rows.append({"id": len(att_rows) + 1, "canteen_id": u["canteen_id"], "user_id": u["id"], "meal_id": mid,
+                                 "date": today, "source": "kiosk"})
+    db.session.execute(db.insert(Reservation), res_rows)
+    db.session.execute(db.insert(Attendance), att_rows)
+    db.session.commit()
+    print(f"Seed: {N_USERS} users, {len(CANTEENS)} cantinas, {len(res_rows)} reservations, "
+          f"{len(att_rows)} attendance em {time.perf_counter() - t0:.1f} s")
+
+    if db.engine.dialect.name == "sqlite":
+        print("\nPlanos (cantina 3):")
+        for label, sql in [
+            ("kiosk/check", "SELECT id FROM reservations WHERE canteen_id=3 AND user_id=99997 AND meal_id=7 AND date='2026-01-01'"),
+            ("mark", "SELECT * FROM reservations WHERE canteen_id=3 AND user_id=99997"),
+            ("dashboard", "SELECT meal_id, count(id) FROM reservations WHERE canteen_id=3 AND date='2026-01-01' GROUP BY meal_id"),
+            ("weekly", "SELECT user_id, meal_id, date FROM attendance WHERE canteen_id=3 AND date BETWEEN '2026-01-01' AND '2026-01-07'"),
+            ("users", "SELECT id FROM users WHERE canteen_id=3"),
+        ]:
+            plan = db.session.execute(db.text("EXPLAIN QUERY PLAN " + sql)).all()
+            print(f"  {label:<12} {' | '.join(row[-1] for row in plan)}")
+        print()
+
+client = app.test_client()
+user_id = 99_997   # pertence à cantina 3 (99 997 % 5 + 1)
+client.get("/admin?canteen_id=3")   # cantina do admin fica na sessão (o quiosque usa o URL)
+
+timed("POST /kiosk (cantina 3)", lambda: client.post("/kiosk?canteen_id=3", data={"user_id": user_id}))
+timed("POST /check (cantina 3)", lambda: client.post("/check?canteen_id=3", data={"user_id": user_id, "meal_id": 7}))
+timed("GET /mark (cantina 3)", lambda: client.get(f"/mark?user_id={user_id}&pin={PIN}"))
+timed("GET /admin (cantina 3)", lambda: client.get("/admin"), n=max(N // 5, 1))
+timed("GET /admin/weekly (cantina 3)", lambda: client.get("/admin/weekly"), n=max(N // 10, 1))
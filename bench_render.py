@@ -0,0 +1,162 @@
+# bench_render.py
+# Mede o arranque dos templates (com/sem cache de bytecode) e o tempo de render por pedido
+# de /mark e /admin/weekly numa BD SQLite temporária.
+# Uso: python bench_render.py [n_pedidos]
+import os, sys, time, tempfile
+from datetime import time as dtime
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["FLASK_DEBUG"] = "0"   # como em produção (com debug os fragmentos não ficam em cache)
+os.environ.setdefault("JINJA_BYTECODE_CACHE_DIR", tempfile.mkdtemp(prefix="jinja_bench_"))
+
+from flask import render_template
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.security import generate_password_hash
+from app import create_app, precompile_templates
+from models import db, Canteen, User, Meal
+import fragments
+import routes
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+USER_ID, PIN = 1, "1234"
+
+
+def timed(label, fn, n=N):
+    fn()  # aquecimento
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    ms = (time.perf_counter() - t0) * 1000 / n
+    print(f"{label:<45} {ms:8.3f} ms/pedido")
+
+
+# mark.html antes dos fragmentos em cache (tudo inline), para comparação
+MARK_INLINE = '''{% extends 'base.html' %}
+{% block content %}
+<h3 class="mb-3">Nº OB: {{ user_id }}</h3>
+
+<form method="post" action="{{ url_for('routes.mark') }}">
+  <input type="hidden" name="user_id" value="{{ user_id }}">
+  <input type="hidden" name="pin" value="{{ pin }}">  
+
+
+  <div class="table-responsive">
+    <table class="table table-sm align-middle bg-white shadow-sm">
+      <thead>
+        <tr>
+          <th>Data</th>
+          {% for meal in meals %}
+            <th class="meal-col">{{ meal.name }}</th>
+          {% endfor %}
+        </tr>
+      </thead>
+      <tbody>
+        {% for d in days %}
+        {% set weekend = d.weekday() >= 5 %}  {# 5=sábado, 6=domingo #}
+        {% set wd = weekdays[d.weekday()] %}
+        <tr class="{% if weekend %}weekend-row{% endif %}">
+          <td class="text-nowrap">
+            {{ d.strftime('%Y/%m/%d') }}
+            <small class="text-muted">({{ wd }})</small>
+          </td>
+          {% for meal in meals %}
+            {% set key = (d, meal.id) %}
+            {% set locked = key in locked_set %}
+            {% set is_canceled = key in canceled_set %}
+            <td class="meal-col {{ 'locked' if locked }}">
+              <div class="form-check d-inline-flex align-items-center gap-2">
+                <input class="form-check-input"
+                      type="checkbox"
+                      name="reservation"
+                      value="{{ d }}_{{ meal.id }}"
+                      id="chk_{{ d }}_{{ meal.id }}"
+                      {% if not is_canceled %}checked{% endif %}
+                      {% if locked %}disabled{% endif %}>
+                {% if locked %}<span class="badge text-bg-secondary badge-locked">bloqueado</span>{% endif %}
+              </div>
+            </td>
+          {% endfor %}
+        </tr>
+        {% endfor %}
+      </tbody>
+    </table>
+  </div>
+
+  <div class="sticky-actions">
+    <button class="btn btn-primary">Guardar alterações</button>
+    <a href="{{ url_for('routes.index') }}" class="btn btn-outline-secondary">Sair</a>
+  </div>
+</form>
+{% endblock %}
+
+'''
+
+
+def timed_create_app(label):
+    t0 = time.perf_counter()
+    app = create_app()   # inclui a pré-compilação dos templates
+    print(f"{label:<45} {(time.perf_counter() - t0) * 1000:8.1f} ms")
+    return app
+
+
+def timed_precompile(app, label, bytecode_cache):
+    env = app.jinja_env
+    env.cache.clear()
+    env.bytecode_cache = bytecode_cache
+    t0 = time.perf_counter()
+    precompile_templates(app)
+    print(f"{label:<45} {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+
+# Arranque: o 2º create_app() (outro worker / reinício) lê o bytecode do 1º
+timed_create_app("create_app() (cache de bytecode vazia)")
+app = timed_create_app("create_app() (cache de bytecode quente)")
+warm_cache = app.jinja_env.bytecode_cache
+timed_precompile(app, "pré-compilação sem cache de bytecode", None)
+timed_precompile(app, "pré-compilação com cache quente", warm_cache)
+print()
+
+app.config["LOGIN_DISABLED"] = True
+CANTEEN_ID = app.config["DEFAULT_CANTEEN_ID"]
+
+with app.app_context():
+    db.create_all()
+    db.session.add(Canteen(id=CANTEEN_ID, name="Bench"))
+    db.session.add_all([
+        Meal(id=1, canteen_id=CANTEEN_ID, name="Pequeno-almoço", scheduled_time=dtime(7, 30)),
+        Meal(id=2, canteen_id=CANTEEN_ID, name="Almoço", scheduled_time=dtime(12, 30)),
+        Meal(id=3, canteen_id=CANTEEN_ID, name="Jantar", scheduled_time=dtime(19, 30)),
+    ])
+    # hash barato para o PBKDF2 não dominar o tempo do pedido
+    db.session.add(User(id=USER_ID, canteen_id=CANTEEN_ID,
+                        pin_hash=generate_password_hash(PIN, method="pbkdf2:sha256:1")))
+    db.session.commit()
+
+    meals = Meal.query.order_by(Meal.id).all()
+    today = routes.datetime.now(routes.APP_TZ).date()
+    days = [today + routes.timedelta(days=i) for i in range(31)]
+    ctx = dict(user_id=USER_ID, pin=PIN, meals=meals, canceled_set=set(), locked_set=set())
+
+    mark_inline = app.jinja_env.from_string(MARK_INLINE)   # compilado uma vez, como o original
+
+    def render_mark():
+        with app.test_request_context("/mark"):
+            render_template(
+                "mark.html",
+                meal_headers=fragments.meal_headers(tuple(m.name for m in meals)),
+                day_rows=fragments.day_rows(today, len(days), tuple(routes.WEEKDAYS_PT)),
+                **ctx,
+            )
+
+    def render_mark_inline():
+        with app.test_request_context("/mark"):
+            render_template(mark_inline, days=days, weekdays=routes.WEEKDAYS_PT, **ctx)
+
+    timed("render mark.html (original, inline)", render_mark_inline)
+    timed("render mark.html (fragmentos em cache)", render_mark)
+
+client = app.test_client()
+timed("GET /mark (pedido completo)",
+      lambda: client.get(f"/mark?user_id={USER_ID}&pin={PIN}"))
+timed("GET /admin/weekly (pedido completo)",
+      lambda: client.get("/admin/weekly"))
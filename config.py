@@ -9,3 +9,10 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "False").lower() == "true"
+
+    # Cache de bytecode do Jinja; sem valor usa a pasta por omissão do Jinja
+    # (_jinja2-cache-<uid>, modo 0700), partilhada pelos workers do mesmo uid
+    JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR")
+
+    # Cantina usada quando o pedido/sessão não indica nenhuma
+    DEFAULT_CANTEEN_ID = int(os.getenv("DEFAULT_CANTEEN_ID", "1"))
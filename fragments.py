@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+from functools import lru_cache, wraps
+from flask import current_app, get_template_attribute
+
+# Fragmentos HTML que não dependem do utilizador (cabeçalhos, linhas de datas).
+# São iguais para todos os pedidos do mesmo dia / mesmo conjunto de refeições,
+# por isso ficam em cache por worker em vez de serem re-renderizados a cada pedido.
+FRAGMENTS_TEMPLATE = '_fragments.html'
+
+
+def _macro(name):
+    return get_template_attribute(FRAGMENTS_TEMPLATE, name)
+
+
+def _fragment_cache(maxsize):
+    """lru_cache que é ignorada com TEMPLATES_AUTO_RELOAD (debug), para as edições aos templates aparecerem."""
+    def decorator(fn):
+        cached = lru_cache(maxsize=maxsize)(fn)
+
+        @wraps(fn)
+        def wrapper(*args):
+            if current_app.jinja_env.auto_reload:
+                return fn(*args)
+            return cached(*args)
+        wrapper.cache_clear = cached.cache_clear
+        return wrapper
+    return decorator
+
+
+@_fragment_cache(maxsize=32)
+def meal_headers(meal_names: tuple[str, ...]):
+    """<tr> do cabeçalho da grelha de marcações (chave: nomes das refeições, por ordem)."""
+    return _macro('meal_headers')(meal_names)
+
+
+@_fragment_cache(maxsize=8)
+def day_rows(start: date, n_days: int, weekdays: tuple[str, ...]):
+    """Lista de (dia, fim_de_semana, <td> da data) para `n_days` dias a partir de `start`."""
+    label = _macro('day_label')
+    rows = []
+    for i in range(n_days):
+        d = start + timedelta(days=i)
+        rows.append((d, d.weekday() >= 5, label(d, weekdays[d.weekday()])))
+    return tuple(rows)
+
+
@@ -0,0 +1,126 @@
+# migrate_canteens.py
+# Migração (PostgreSQL, idempotente):
+#   1) alarga users.id / meals.id e as FKs de reservations/attendance de SMALLINT para INTEGER
+#      (o SMALLINT limitava a 32 767 utilizadores);
+#   2) cria a tabela canteens (timezone e janela do quiosque por cantina) com a cantina atual;
+#   3) acrescenta canteen_id a users, meals, reservations e attendance,
+#      troca as FKs user_id/meal_id por FKs compostas (canteen_id, user_id|meal_id)
+#      — uma linha não pode apontar para um user/refeição de outra cantina —
+#      e cria os índices compostos começados por canteen_id.
+# Uso: python migrate_canteens.py ["Nome da cantina atual"]
+import sys
+from app import create_app
+from models import db
+
+DEFAULT_NAME = sys.argv[1] if len(sys.argv) > 1 else "Cantina principal"
+
+WIDEN = [
+    ("users", "id"),
+    ("meals", "id"),
+    ("reservations", "user_id"),
+    ("reservations", "meal_id"),
+    ("attendance", "user_id"),
+    ("attendance", "meal_id"),
+]
+
+# (tabela, nome, definição) — alvos UNIQUE primeiro, depois as FKs compostas
+CONSTRAINTS = [
+    ("meals", "uq_meals_canteen_name", "UNIQUE (canteen_id, name)"),
+    ("users", "uq_users_canteen_id", "UNIQUE (canteen_id, id)"),
+    ("meals", "uq_meals_canteen_id", "UNIQUE (canteen_id, id)"),
+    ("reservations", "fk_reservations_canteen_user",
+     "FOREIGN KEY (canteen_id, user_id) REFERENCES users (canteen_id, id)"),
+    ("reservations", "fk_reservations_canteen_meal",
+     "FOREIGN KEY (canteen_id, meal_id) REFERENCES meals (canteen_id, id)"),
+    ("attendance", "fk_attendance_canteen_user",
+     "FOREIGN KEY (canteen_id, user_id) REFERENCES users (canteen_id, id)"),
+    ("attendance", "fk_attendance_canteen_meal",
+     "FOREIGN KEY (canteen_id, meal_id) REFERENCES meals (canteen_id, id)"),
+]
+
+INDEXES = [
+    "DROP INDEX IF EXISTS ix_users_canteen_id",   # coberto por uq_users_canteen_id
+    "CREATE INDEX IF NOT EXISTS ix_reservations_canteen_date_meal ON reservations (canteen_id, date, meal_id)",
+    "CREATE INDEX IF NOT EXISTS ix_reservations_canteen_user_date ON reservations (canteen_id, user_id, date)",
+    "CREATE INDEX IF NOT EXISTS ix_attendance_canteen_date_meal ON attendance (canteen_id, date, meal_id)",
+]
+
+app = create_app()
+
+try:
+    with app.app_context():
+        print("DB URI =", app.config.get("SQLALCHEMY_DATABASE_URI"))
+        default_id = app.config["DEFAULT_CANTEEN_ID"]
+
+        # 1) SMALLINT -> INTEGER (o Postgres aceita FKs entre smallint e integer durante a troca)
+        print("A alargar IDs para INTEGER...")
+        for table, column in WIDEN:
+            db.session.execute(db.text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE INTEGER"))
+        for table in ("users", "meals"):
+            seq = db.session.execute(
+                db.text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}
+            ).scalar()
+            if seq:
+                db.session.execute(db.text(f"ALTER SEQUENCE {seq} AS INTEGER"))
+
+        # 2) Cantinas
+        print("A criar tabela canteens...")
+        db.session.execute(db.text("""
+            CREATE TABLE IF NOT EXISTS canteens (
+              id                SERIAL PRIMARY KEY,
+              name              TEXT NOT NULL UNIQUE,
+              timezone          TEXT NOT NULL DEFAULT 'Europe/Bucharest',
+              window_before_min INTEGER NOT NULL DEFAULT 60,
+              window_after_min  INTEGER NOT NULL DEFAULT 180
+            )
+        """))
+        db.session.execute(
+            db.text("INSERT INTO canteens (id, name) VALUES (:i, :n) ON CONFLICT DO NOTHING"),
+            {"i": default_id, "n": DEFAULT_NAME}
+        )
+        db.session.execute(db.text(
+            "SELECT setval(pg_get_serial_sequence('canteens', 'id'), (SELECT max(id) FROM canteens))"
+        ))
+
+        # 3) canteen_id (os dados existentes ficam na cantina por omissão)
+        print("A acrescentar canteen_id...")
+        for table in ("users", "meals", "reservations", "attendance"):
+            db.session.execute(db.text(f"""
+                ALTER TABLE {table}
+                  ADD COLUMN IF NOT EXISTS canteen_id INTEGER NOT NULL DEFAULT {int(default_id)}
+                  REFERENCES canteens(id)
+            """))
+            db.session.execute(db.text(f"ALTER TABLE {table} ALTER COLUMN canteen_id DROP DEFAULT"))
+
+        # nome da refeição passa a ser único por cantina
+        db.session.execute(db.text("ALTER TABLE meals DROP CONSTRAINT IF EXISTS meals_name_key"))
+
+        # FKs simples user_id -> users / meal_id -> meals dão lugar às compostas
+        print("A trocar FKs por FKs compostas (canteen_id, ...)...")
+        for table in ("reservations", "attendance"):
+            old_fks = db.session.execute(db.text("""
+                SELECT conname FROM pg_constraint
+                 WHERE conrelid = CAST(:t AS regclass) AND contype = 'f'
+                   AND confrelid IN ('users'::regclass, 'meals'::regclass)
+                   AND array_length(conkey, 1) = 1
+            """), {"t": table}).scalars().all()
+            for name in old_fks:
+                db.session.execute(db.text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+
+        for table, name, definition in CONSTRAINTS:
+            exists = db.session.execute(
+                db.text("SELECT 1 FROM pg_constraint WHERE conname = :n"), {"n": name}
+            ).first()
+            if not exists:
+                db.session.execute(db.text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+
+        print("A criar índices por cantina...")
+        for stmt in INDEXES:
+            db.session.execute(db.text(stmt))
+
+        db.session.commit()
+        print("✅ Migração concluída.")
+
+except Exception as e:
+    print("❌ Erro:", e)
+    sys.exit(1)
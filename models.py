@@ -1,15 +1,47 @@
+from datetime import timedelta
+from zoneinfo import ZoneInfo
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
 
+class Canteen(db.Model):
+    __tablename__ = 'canteens'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.Text, nullable=False, unique=True)
+    timezone = db.Column(db.Text, nullable=False, default='Europe/Bucharest')
+    # janela de validação do quiosque (minutos antes/depois da hora da refeição)
+    window_before_min = db.Column(db.Integer, nullable=False, default=60)
+    window_after_min = db.Column(db.Integer, nullable=False, default=180)
+
+    @property
+    def tz(self) -> ZoneInfo:
+        return ZoneInfo(self.timezone)
+
+    @property
+    def window_before(self) -> timedelta:
+        return timedelta(minutes=self.window_before_min)
+
+    @property
+    def window_after(self) -> timedelta:
+        return timedelta(minutes=self.window_after_min)
+
+
 class User(db.Model):
     __tablename__ = 'users'
-    id = db.Column(db.SmallInteger, primary_key=True)
+    id = db.Column(db.Integer, primary_key=True)
+    canteen_id = db.Column(db.Integer, db.ForeignKey('canteens.id'), nullable=False)
     pin_hash = db.Column(db.Text, nullable=True)
     pin_set_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
 
+    canteen = db.relationship('Canteen')
+
+    # alvo das FKs compostas (canteen_id, user_id) de reservations/attendance
+    __table_args__ = (
+        db.UniqueConstraint('canteen_id', 'id', name='uq_users_canteen_id'),
+    )
+
     # helpers (opcional)
     def set_pin(self, pin: str):
         self.pin_hash = generate_password_hash(str(pin))
@@ -20,13 +52,18 @@ class User(db.Model):
         return check_password_hash(self.pin_hash, str(pin))
 
 
-
 class Meal(db.Model):
     __tablename__ = 'meals'
-    id = db.Column(db.SmallInteger, primary_key=True)
-    name = db.Column(db.Text, nullable=False, unique=True)
+    id = db.Column(db.Integer, primary_key=True)
+    canteen_id = db.Column(db.Integer, db.ForeignKey('canteens.id'), nullable=False)
+    name = db.Column(db.Text, nullable=False)
     scheduled_time = db.Column(db.Time, nullable=False)
 
+    __table_args__ = (
+        db.UniqueConstraint('canteen_id', 'name', name='uq_meals_canteen_name'),
+        db.UniqueConstraint('canteen_id', 'id', name='uq_meals_canteen_id'),
+    )
+
 class Validator(db.Model):
     __tablename__ = 'validators'
     id = db.Column(db.BigInteger, primary_key=True)
@@ -44,25 +81,43 @@ class Validator(db.Model):
 class Reservation(db.Model):
     __tablename__ = 'reservations'
     id = db.Column(db.BigInteger, primary_key=True)
-    user_id = db.Column(db.SmallInteger, db.ForeignKey('users.id'), nullable=False)
-    meal_id = db.Column(db.SmallInteger, db.ForeignKey('meals.id'), nullable=False)
+    canteen_id = db.Column(db.Integer, db.ForeignKey('canteens.id'), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    meal_id = db.Column(db.Integer, nullable=False)
     date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
 
-    user = db.relationship('User')
-    meal = db.relationship('Meal')
+    user = db.relationship('User', viewonly=True)
+    meal = db.relationship('Meal', viewonly=True)
+
+    # todas as consultas são de uma só cantina: índices começam por canteen_id;
+    # as FKs compostas garantem que user e meal são da mesma cantina da linha
+    __table_args__ = (
+        db.ForeignKeyConstraint(['canteen_id', 'user_id'], ['users.canteen_id', 'users.id'],
+                                name='fk_reservations_canteen_user'),
+        db.ForeignKeyConstraint(['canteen_id', 'meal_id'], ['meals.canteen_id', 'meals.id'],
+                                name='fk_reservations_canteen_meal'),
+        db.Index('ix_reservations_canteen_date_meal', 'canteen_id', 'date', 'meal_id'),
+        db.Index('ix_reservations_canteen_user_date', 'canteen_id', 'user_id', 'date'),
+    )
 
 class Attendance(db.Model):
     __tablename__ = 'attendance'
     id = db.Column(db.BigInteger, primary_key=True)
-    user_id = db.Column(db.SmallInteger, db.ForeignKey('users.id'), nullable=False)
-    meal_id = db.Column(db.SmallInteger, db.ForeignKey('meals.id'), nullable=False)
+    canteen_id = db.Column(db.Integer, db.ForeignKey('canteens.id'), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    meal_id = db.Column(db.Integer, nullable=False)
     date = db.Column(db.Date, nullable=False)
     validated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
     source = db.Column(db.Text, nullable=False, default='kiosk')
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'meal_id', 'date', name='uq_attendance_user_meal_date'),
+        db.ForeignKeyConstraint(['canteen_id', 'user_id'], ['users.canteen_id', 'users.id'],
+                                name='fk_attendance_canteen_user'),
+        db.ForeignKeyConstraint(['canteen_id', 'meal_id'], ['meals.canteen_id', 'meals.id'],
+                                name='fk_attendance_canteen_meal'),
+        db.Index('ix_attendance_canteen_date_meal', 'canteen_id', 'date', 'meal_id'),
     )
 
 
@@ -1,25 +1,51 @@
+import heapq
 from datetime import datetime, timedelta, date
 from zoneinfo import ZoneInfo
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, g, abort, current_app
 from flask_login import login_required
-from models import db, User, Meal, Reservation, Attendance
+from models import db, Canteen, User, Meal, Reservation, Attendance
 from sqlalchemy import func
 from werkzeug.security import generate_password_hash, check_password_hash
+import fragments
 
 
 
 bp = Blueprint('routes', __name__)
 
-# Timezone da aplicação (Bucareste)
+# Timezone por omissão (Bucareste); cada cantina tem a sua em Canteen.timezone
 APP_TZ = ZoneInfo("Europe/Bucharest")
 
 # Dias da semana em PT (0=segunda ... 6=domingo)
 WEEKDAYS_PT = ['SEG', 'TER', 'QUA', 'QUI', 'SEX', 'SAB', 'DOM']
 
-# Janela de validação do quiosque
+# Janela de validação do quiosque (por omissão; cada cantina pode ter a sua)
 WINDOW_BEFORE = timedelta(minutes=60)
 WINDOW_AFTER  = timedelta(minutes=180)
 
+
+def current_canteen(remember=False):
+    """Cantina do pedido: ?canteen_id=... ou a cantina por omissão.
+
+    O quiosque e a verificação ficam presos à cantina do URL (ex.: /kiosk?canteen_id=2).
+    Só as vistas de admin (já autenticadas) usam `remember=True`, que guarda a escolha na sessão.
+    """
+    if 'canteen' not in g:
+        default_id = current_app.config['DEFAULT_CANTEEN_ID']
+        canteen_id = request.args.get('canteen_id', type=int)
+        if remember:
+            canteen_id = canteen_id or session.get('admin_canteen_id')
+        canteen_id = canteen_id or default_id
+        canteen = db.session.get(Canteen, canteen_id)
+        if canteen is None and canteen_id != default_id:
+            # id desconhecido ou já removido → volta à cantina por omissão
+            canteen = db.session.get(Canteen, default_id)
+        if canteen is None:
+            abort(404)
+        if remember:
+            session['admin_canteen_id'] = canteen.id
+        g.canteen = canteen
+    return g.canteen
+
 # definir a semana para depois utilziar para as estatisticas semanais
 def week_range_sat_to_fri(anchor: date | None = None):
     """Devolve (start, end) de uma semana Sábado..Sexta que contém `anchor` (ou hoje)."""
@@ -33,19 +59,19 @@ def week_range_sat_to_fri(anchor: date | None = None):
     end   = start + timedelta(days=6)
     return start, end
 
-def in_window(meal_time, now=None):
+def in_window(meal_time, now=None, tz=APP_TZ, before=WINDOW_BEFORE, after=WINDOW_AFTER):
     """True se o momento atual estiver dentro da janela de validação da refeição de HOJE."""
     if now is None:
-        now = datetime.now(APP_TZ)
-    start = datetime.combine(now.date(), meal_time, tzinfo=APP_TZ) - WINDOW_BEFORE
-    end   = datetime.combine(now.date(), meal_time, tzinfo=APP_TZ) + WINDOW_AFTER
+        now = datetime.now(tz)
+    start = datetime.combine(now.date(), meal_time, tzinfo=tz) - before
+    end   = datetime.combine(now.date(), meal_time, tzinfo=tz) + after
     return start <= now <= end
 
-def is_locked(day, meal_time, now=None, hours=48):
+def is_locked(day, meal_time, now=None, hours=48, tz=APP_TZ):
     """True se (day + meal_time) estiver a menos de `hours` horas (bloqueado)."""
     if now is None:
-        now = datetime.now(APP_TZ)
-    meal_dt = datetime.combine(day, meal_time, tzinfo=APP_TZ)
+        now = datetime.now(tz)
+    meal_dt = datetime.combine(day, meal_time, tzinfo=tz)
     return (meal_dt - now) < timedelta(hours=hours)
     # Se preferires bloquear também exatamente às 48:00:00, troca por: <=
 
@@ -78,20 +104,22 @@ def mark():
     if not pin or not user.pin_hash or not check_password_hash(user.pin_hash, str(pin)):
         return render_template('index.html', error='PIN inválido ou em falta')
 
+    canteen = user.canteen   # cantina do utilizador, não a da sessão
 
-    meals = Meal.query.order_by(Meal.id).all()
-    now = datetime.now(APP_TZ)
+
+    meals = Meal.query.filter_by(canteen_id=canteen.id).order_by(Meal.id).all()
+    now = datetime.now(canteen.tz)
     today = now.date()
     days = [(today + timedelta(days=i)) for i in range(0, 31)]
 
-    existing = Reservation.query.filter_by(user_id=user_id).all()
+    existing = Reservation.query.filter_by(canteen_id=canteen.id, user_id=user_id).all()
     canceled_set = {(r.date, r.meal_id) for r in existing}
 
     locked_set = {
         (d, meal.id)
         for d in days
         for meal in meals
-        if is_locked(d, meal.scheduled_time, now=now)
+        if is_locked(d, meal.scheduled_time, now=now, tz=canteen.tz)
     }
 
     if request.method == 'POST':
@@ -104,11 +132,14 @@ def mark():
                 wants_attend = key in selected
                 is_canceled = (d, meal.id) in canceled_set
                 if wants_attend and is_canceled:
-                    res = Reservation.query.filter_by(user_id=user_id, meal_id=meal.id, date=d).first()
+                    res = Reservation.query.filter_by(
+                        canteen_id=canteen.id, user_id=user_id, meal_id=meal.id, date=d
+                    ).first()
                     if res:
                         db.session.delete(res)
                 elif (not wants_attend) and (not is_canceled):
-                    db.session.add(Reservation(user_id=user_id, meal_id=meal.id, date=d))
+                    db.session.add(Reservation(canteen_id=canteen.id, user_id=user_id,
+                                               meal_id=meal.id, date=d))
         try:
             db.session.commit()
             flash('Refeições atualizadas!', 'success')
@@ -125,14 +156,15 @@ def mark():
         user_id=user_id,
         pin=pin,                    # <- PASSA O PIN PARA O TEMPLATE
         meals=meals,
-        days=days,
+        meal_headers=fragments.meal_headers(tuple(m.name for m in meals)),
+        day_rows=fragments.day_rows(today, len(days), tuple(WEEKDAYS_PT)),
         canceled_set=canceled_set,
         locked_set=locked_set,
-        weekdays=WEEKDAYS_PT
     )
 
 @bp.route('/check', methods=['GET', 'POST'])
 def check():
+    canteen = current_canteen()
     result = None
     selected_meal = None
     if request.method == 'POST':
@@ -143,25 +175,43 @@ def check():
             user_id = None
             meal_id = None
 
-        today = datetime.now(APP_TZ).date()
+        # só utilizadores e refeições desta cantina
+        if user_id and not db.session.query(User.id).filter_by(
+            canteen_id=canteen.id, id=user_id
+        ).first():
+            user_id = None
+        if meal_id and not Meal.query.filter_by(canteen_id=canteen.id, id=meal_id).first():
+            meal_id = None
+
+        today = datetime.now(canteen.tz).date()
         if user_id and meal_id:
             # OPT-OUT: se existir linha = cancelou → vermelho; se não existir = marcado → verde
-            res = Reservation.query.filter_by(user_id=user_id, meal_id=meal_id, date=today).first()
+            res = Reservation.query.filter_by(
+                canteen_id=canteen.id, user_id=user_id, meal_id=meal_id, date=today
+            ).first()
             result = 'green' if not res else 'red'
             selected_meal = meal_id
+        else:
+            result = 'red'
 
-    meals = Meal.query.order_by(Meal.id).all()
+    meals = Meal.query.filter_by(canteen_id=canteen.id).order_by(Meal.id).all()
     return render_template('check.html', meals=meals, result=result, selected_meal=selected_meal)
 
 @bp.route('/kiosk', methods=['GET', 'POST'])
 @login_required
 def kiosk():
-    meals = Meal.query.order_by(Meal.id).all()
-    now = datetime.now(APP_TZ)
+    canteen = current_canteen()
+    meals = Meal.query.filter_by(canteen_id=canteen.id).order_by(Meal.id).all()
+    now = datetime.now(canteen.tz)
     today = now.date()
 
     # escolhe a refeição cuja janela está ativa
-    current_meal = next((m for m in meals if in_window(m.scheduled_time, now=now)), None)
+    current_meal = next(
+        (m for m in meals
+         if in_window(m.scheduled_time, now=now, tz=canteen.tz,
+                      before=canteen.window_before, after=canteen.window_after)),
+        None
+    )
 
     result = None
     msg = None
@@ -173,6 +223,12 @@ def kiosk():
         except (KeyError, ValueError):
             user_id = None
 
+        # só utilizadores desta cantina
+        if user_id and not db.session.query(User.id).filter_by(
+            canteen_id=canteen.id, id=user_id
+        ).first():
+            user_id = None
+
         if not user_id:
             result, msg = 'red', 'Número de OB inválido.'
         elif not current_meal:
@@ -184,7 +240,7 @@ def kiosk():
 
             # modelo opt-out: se existir linha em reservations = cancelado
             canceled = Reservation.query.filter_by(
-                user_id=user_id, meal_id=meal_id, date=day
+                canteen_id=canteen.id, user_id=user_id, meal_id=meal_id, date=day
             ).first() is not None
 
             if canceled:
@@ -196,7 +252,8 @@ def kiosk():
                 ).first()
                 if not existing:
                     try:
-                        db.session.add(Attendance(user_id=user_id, meal_id=meal_id, date=day))
+                        db.session.add(Attendance(canteen_id=canteen.id, user_id=user_id,
+                                                  meal_id=meal_id, date=day))
                         db.session.commit()
                     except Exception:
                         db.session.rollback()
@@ -214,29 +271,34 @@ def kiosk():
 @bp.route('/admin')
 @login_required
 def admin_dashboard():
+    canteen = current_canteen(remember=True)
     date_str = request.args.get('date')
     try:
-        day = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now(APP_TZ).date()
+        day = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now(canteen.tz).date()
     except ValueError:
-        day = datetime.now(APP_TZ).date()
+        day = datetime.now(canteen.tz).date()
 
-    total_users = db.session.query(func.count(User.id)).scalar() or 0
+    total_users = (
+        db.session.query(func.count(User.id))
+        .filter(User.canteen_id == canteen.id)
+        .scalar() or 0
+    )
 
     canceled = dict(
         db.session.query(Reservation.meal_id, func.count(Reservation.id))
-        .filter(Reservation.date == day)
+        .filter(Reservation.canteen_id == canteen.id, Reservation.date == day)
         .group_by(Reservation.meal_id)
         .all()
     )
     present = dict(
         db.session.query(Attendance.meal_id, func.count(Attendance.id))
-        .filter(Attendance.date == day)
+        .filter(Attendance.canteen_id == canteen.id, Attendance.date == day)
         .group_by(Attendance.meal_id)
         .all()
     )
 
     cards = []
-    for meal in Meal.query.order_by(Meal.id).all():
+    for meal in Meal.query.filter_by(canteen_id=canteen.id).order_by(Meal.id).all():
         c = canceled.get(meal.id, 0)
         p = present.get(meal.id, 0)
         expected = total_users - c
@@ -252,24 +314,27 @@ def admin_dashboard():
     reservations = (
         db.session.query(Reservation, Meal)
         .join(Meal, Reservation.meal_id == Meal.id)
-        .filter(Reservation.date == day)
+        .filter(Reservation.canteen_id == canteen.id, Reservation.date == day)
         .order_by(Meal.id, Reservation.user_id)
         .all()
     )
 
-    return render_template('admin_dashboard.html', day=day, cards=cards, reservations=reservations)
+    canteens = Canteen.query.order_by(Canteen.id).all()
+    return render_template('admin_dashboard.html', day=day, cards=cards, reservations=reservations,
+                           canteen=canteen, canteens=canteens)
 
 @bp.route('/admin/absences')
 @login_required
 def admin_absences():
+    canteen = current_canteen(remember=True)
     date_str = request.args.get('date')
     meal_id = request.args.get('meal_id', type=int)
     try:
-        day = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now(APP_TZ).date()
+        day = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now(canteen.tz).date()
     except ValueError:
-        day = datetime.now(APP_TZ).date()
+        day = datetime.now(canteen.tz).date()
 
-    meal = Meal.query.get(meal_id)
+    meal = Meal.query.filter_by(canteen_id=canteen.id, id=meal_id).first()
     if not meal:
         flash('Refeição inválida', 'danger')
         return redirect(url_for('routes.admin_dashboard', date=day.strftime('%Y-%m-%d')))
@@ -277,15 +342,15 @@ def admin_absences():
     # Esperados = todos - cancelados
     canceled_users = {
         r.user_id for r in Reservation.query.with_entities(Reservation.user_id)
-        .filter_by(date=day, meal_id=meal_id).all()
+        .filter_by(canteen_id=canteen.id, date=day, meal_id=meal_id).all()
     }
-    all_users = {u.id for u in User.query.with_entities(User.id).all()}
+    all_users = {u.id for u in User.query.with_entities(User.id).filter_by(canteen_id=canteen.id).all()}
     expected_users = all_users - canceled_users
 
     # Presentes
     present_users = {
         a.user_id for a in Attendance.query.with_entities(Attendance.user_id)
-        .filter_by(date=day, meal_id=meal_id).all()
+        .filter_by(canteen_id=canteen.id, date=day, meal_id=meal_id).all()
     }
 
     absent_users = sorted(expected_users - present_users)
@@ -300,28 +365,30 @@ def admin_weekly():
       - Top utilizadores com mais faltas (faltas = esperados - presentes)
       - Totais por refeição e percentagens
     """
+    canteen = current_canteen(remember=True)
     # Aceita ?anchor=YYYY-MM-DD para navegar semanas; se não vier: hoje
     anchor_str = request.args.get('anchor')
     try:
-        anchor = datetime.strptime(anchor_str, '%Y-%m-%d').date() if anchor_str else datetime.now().date()
+        anchor = datetime.strptime(anchor_str, '%Y-%m-%d').date() if anchor_str else datetime.now(canteen.tz).date()
     except ValueError:
-        anchor = datetime.now().date()
+        anchor = datetime.now(canteen.tz).date()
 
     week_start, week_end = week_range_sat_to_fri(anchor)
 
     # Dados base
-    meals = Meal.query.order_by(Meal.id).all()
+    meals = Meal.query.filter_by(canteen_id=canteen.id).order_by(Meal.id).all()
     all_days = [week_start + timedelta(days=i) for i in range(7)]
 
     # Universo de utilizadores
-    all_user_ids = [u.id for u in User.query.with_entities(User.id).all()]
+    all_user_ids = [u.id for u in User.query.with_entities(User.id).filter_by(canteen_id=canteen.id).all()]
     all_user_set = set(all_user_ids)
 
     # Buscar CANCELAMENTOS da semana (opt-out)
     res_rows = (
         Reservation.query
         .with_entities(Reservation.user_id, Reservation.meal_id, Reservation.date)
-        .filter(Reservation.date >= week_start, Reservation.date <= week_end)
+        .filter(Reservation.canteen_id == canteen.id,
+                Reservation.date >= week_start, Reservation.date <= week_end)
         .all()
     )
     canceled_map: dict[tuple[date,int], set[int]] = {}
@@ -332,7 +399,8 @@ def admin_weekly():
     att_rows = (
         Attendance.query
         .with_entities(Attendance.user_id, Attendance.meal_id, Attendance.date)
-        .filter(Attendance.date >= week_start, Attendance.date <= week_end)
+        .filter(Attendance.canteen_id == canteen.id,
+                Attendance.date >= week_start, Attendance.date <= week_end)
         .all()
     )
     present_map: dict[tuple[date,int], set[int]] = {}
@@ -361,22 +429,18 @@ def admin_weekly():
             for uid in absent_set:
                 absences_per_user[uid] = absences_per_user.get(uid, 0) + 1
 
-    # Top faltosos (ordena desc, ignora quem tem 0)
-    top_absentees = sorted(
+    # Top 50 faltosos (ordena desc, ignora quem tem 0)
+    top_absentees = heapq.nlargest(
+        50,
         ((uid, cnt) for uid, cnt in absences_per_user.items() if cnt > 0),
         key=lambda x: x[1],
-        reverse=True
     )
 
-    # Traz info básica dos users (se tiveres campos como name, mostra; senão, fica só o id)
-    users_map = {u.id: u for u in User.query.filter(User.id.in_([uid for uid, _ in top_absentees])).all()}
-
-    # Preparar linhas para a tabela
-    top_rows = []
-    for uid, cnt in top_absentees:
-        u = users_map.get(uid)
-        display = getattr(u, "name", None) or getattr(u, "full_name", None) or f"{uid}"
-        top_rows.append({"user_id": uid, "display": display, "absences": cnt})
+    # Preparar linhas para a tabela (User só tem o id, não é preciso ir à BD)
+    top_rows = [
+        {"user_id": uid, "display": f"{uid}", "absences": cnt}
+        for uid, cnt in top_absentees
+    ]
 
     # Converter totais por refeição para lista ordenada pelo id
     per_meal_rows = []
@@ -401,7 +465,7 @@ def admin_weekly():
         'admin_weekly.html',
         week_start=week_start,
         week_end=week_end,
-        top_rows=top_rows[:50],
+        top_rows=top_rows,
         per_meal_rows=per_meal_rows,
         prev_anchor=prev_anchor,
         next_anchor=next_anchor,